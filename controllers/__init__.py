@@ -1,3 +1,4 @@
+from .controller import cache
 from .users_controller import UsersController
 from .groups_controller import GroupsController
 from .roles_controller import RolesController
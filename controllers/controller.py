@@ -2,12 +2,17 @@ from datetime import datetime
 import math
 
 from flask import abort, flash, redirect, render_template, request, url_for
+from flask_caching import Cache
 from sqlalchemy.exc import IntegrityError, InternalError
 from wtforms import ValidationError
 
 from qwc_services_core.config_models import ConfigModels
 
 
+# cache for rarely changing ConfigDB lookups (initialized by application)
+cache = Cache()
+
+
 class Controller:
     """Controller base class
 
@@ -40,6 +45,12 @@ class Controller:
 
         self.add_routes(app)
 
+    def __repr__(self):
+        """Return controller name as stable key for memoized lookups, so
+        that cached results are shared between processes.
+        """
+        return "%s(%s)" % (self.__class__.__name__, self.base_route)
+
     def add_routes(self, app):
         """Add routes for this controller.
 
@@ -409,6 +420,18 @@ class Controller:
         field.errors.append(error)
         raise error
 
+    def get_config_timestamp(self, session):
+        """Return timestamp of last config change, or None if not set.
+
+        :param Session session: DB session
+        """
+        LastUpdate = self.config_models.model('last_update')
+        last_update = session.query(LastUpdate).first()
+        if last_update is None:
+            return None
+
+        return last_update.updated_at
+
     def update_config_timestamp(self, session):
         """Update timestamp of last config change to current UTC time.
 
@@ -427,6 +450,27 @@ class Controller:
         last_update.updated_at = datetime.utcnow()
         session.commit()
 
+    @cache.memoize()
+    def resource_types_list(self, tenant, config_timestamp):
+        """Return resource types as list of (name, description, list_order)
+        sorted by list order.
+
+        The result is cached per tenant and config timestamp, so that any
+        config change also refreshes the cache of other processes.
+
+        :param str tenant: Tenant name
+        :param datetime config_timestamp: Timestamp of last config change
+        """
+        session = self.session()
+        query = session.query(self.ResourceType) \
+            .order_by(self.ResourceType.list_order, self.ResourceType.name)
+        resource_types = [
+            (t.name, t.description, t.list_order) for t in query.all()
+        ]
+        session.close()
+
+        return resource_types
+
     def update_form_collection(
         self, resource, edit_form, multi_select, relation_model,
         collection_attr, id_attr, name_attr, session
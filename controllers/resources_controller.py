@@ -1,18 +1,38 @@
+import base64
 from collections import OrderedDict
-import math
+import hashlib
+import json
 import requests
+from requests.adapters import HTTPAdapter
+import time
+import ujson
 from urllib.parse import urljoin
-
-from flask import abort, flash, redirect, render_template, request, url_for
-from sqlalchemy.orm import joinedload
-
-from .controller import Controller
+from urllib3.util.retry import Retry
+
+from flask import abort, flash, get_flashed_messages, make_response, \
+    redirect, render_template, request, Response, url_for
+from flask import session as flask_session
+from sqlalchemy import all_, and_, BigInteger, bindparam, cast, exists, func, \
+    literal, or_, select, String, text, Text, tuple_
+from sqlalchemy.dialects.postgresql import array, ARRAY, insert
+from sqlalchemy.orm import contains_eager, load_only, raiseload, \
+    selectinload
+
+from .controller import cache, Controller
 from forms import ResourceForm
 
 
 class ResourcesController(Controller):
     """Controller for resource model"""
 
+    # timeouts for config generator requests as (connect, read) in seconds
+    CONFIG_GENERATOR_TIMEOUT = (3.05, 30)
+    # cache timeout for config generator responses in seconds
+    CONFIG_GENERATOR_CACHE_TIMEOUT = 30
+    # lifetime of resources list ETag in seconds
+    #   NOTE: must be below CSRF token lifetime of forms in list (default: 1h)
+    INDEX_ETAG_LIFETIME = 1800
+
     def __init__(self, app, handler):
         """Constructor
 
@@ -50,6 +70,16 @@ class ResourcesController(Controller):
             self.import_children, methods=['POST']
         )
 
+        # HTTP session with connection pool for config generator requests
+        #   NOTE: no retries on read timeouts of slow config generator runs
+        self.http_session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=4, pool_maxsize=8,
+            max_retries=Retry(total=2, read=0, backoff_factor=0.2)
+        )
+        self.http_session.mount('http://', adapter)
+        self.http_session.mount('https://', adapter)
+
     def resources_for_index_query(self, search_text, resource_type, session):
         """Return query for resources list filtered by resource type.
 
@@ -71,18 +101,35 @@ class ResourcesController(Controller):
             # filter by resource type
             query = query.filter(self.Resource.type == resource_type)
 
-        # eager load relations
-        query = query.options(joinedload(self.Resource.parent))
+        # load only columns and relations used in resources list
+        query = query.options(
+            load_only(
+                self.Resource.id, self.Resource.type, self.Resource.name,
+                self.Resource.parent_id
+            ),
+            selectinload(self.Resource.parent).load_only(
+                self.Resource.id, self.Resource.type, self.Resource.name
+            ),
+            raiseload('*')
+        )
 
         return query
 
-    def order_by_criterion(self, sort, sort_asc):
-        """Return order_by criterion for sorted resources list as tuple.
+    def sort_keys(self, sort, sort_asc):
+        """Return sort columns for resources list as list of
+        (column, ascending) tuples, or None if column is not sortable.
 
-        :param str sort: Column name for sorting
+        The last sort column is always the resource ID, so that the sort
+        columns are unique and can be used as keys for keyset pagination.
+
+        :param str sort: Column name for sorting (None for default order)
         :param bool sort_asc: Set to sort in ascending order
         """
         sortable_columns = {
+            None: [
+                self.ResourceType.list_order, self.Resource.type,
+                self.Resource.name, self.Resource.id
+            ],
             'id': [self.Resource.id],
             'type': [
                 self.ResourceType.name, self.Resource.name, self.Resource.id
@@ -93,22 +140,146 @@ class ResourcesController(Controller):
             ]
         }
 
-        order_by = sortable_columns.get(sort)
-        if order_by is not None:
-            if not sort_asc:
-                # sort in descending order
-                order_by[0] = order_by[0].desc()
-            # convert multiple columns to tuple
-            order_by = tuple(order_by)
+        columns = sortable_columns.get(sort)
+        if columns is None:
+            return None
+
+        # sort direction only applies to first column
+        return [
+            (column, sort_asc or i > 0) for i, column in enumerate(columns)
+        ]
+
+    def keyset_filter(self, keys, values):
+        """Return filter for rows following the key values in sort order.
+
+        Leading columns with the same sort direction are compared as
+        row values, e.g. '(a, b) > (:a, :b)'.
+
+        :param list keys: Sort columns as list of (column, ascending) tuples
+        :param list values: Key values of last row of previous page
+        """
+        # get leading columns with same sort direction
+        ascending = keys[0][1]
+        count = 1
+        while count < len(keys) and keys[count][1] == ascending:
+            count += 1
+
+        columns = tuple_(*[column for column, asc in keys[:count]])
+        key_values = tuple_(*values[:count])
+        if ascending:
+            criterion = columns > key_values
+        else:
+            criterion = columns < key_values
+
+        if count < len(keys):
+            # compare remaining columns if leading columns are equal
+            criterion = or_(
+                criterion,
+                and_(
+                    columns == key_values,
+                    self.keyset_filter(keys[count:], values[count:])
+                )
+            )
+
+        return criterion
+
+    def encode_cursor(self, direction, values):
+        """Return URL-safe pagination cursor.
+
+        :param str direction: Page direction ('next' or 'prev')
+        :param list values: Key values of first or last row of current page
+        """
+        data = json.dumps([direction] + list(values))
+        return base64.urlsafe_b64encode(data.encode('utf-8')).decode('ascii')
+
+    def decode_cursor(self, cursor, keys):
+        """Return pagination cursor as (direction, values) or None if invalid.
+
+        :param str cursor: Cursor from request args
+        :param list keys: Sort columns as list of (column, ascending) tuples
+        """
+        if not cursor:
+            return None
+
+        try:
+            data = json.loads(
+                base64.urlsafe_b64decode(cursor.encode('ascii'))
+            )
+            direction = data[0]
+            values = data[1:]
+            if (
+                direction in ['next', 'prev'] and len(values) == len(keys)
+                and all(
+                    # value must match type of sort column
+                    type(value) is column.type.python_type
+                    for (column, ascending), value in zip(keys, values)
+                )
+            ):
+                return direction, values
+        except Exception as e:
+            self.logger.debug("Invalid pagination cursor '%s'" % cursor)
+
+        return None
+
+    def approximate_count(self, session):
+        """Return estimated number of resources from table statistics.
 
-        return order_by
+        :param Session session: DB session
+        """
+        table = self.Resource.__table__
+        sql = text(
+            "SELECT reltuples FROM pg_class "
+            "WHERE oid = CAST(:table AS regclass)"
+        )
+        count = session.execute(sql, {'table': str(table)}).scalar()
+        if count is None or count < 0:
+            # no statistics available
+            return None
+
+        return int(count)
+
+    def index_etag(self, config_timestamp):
+        """Return ETag for resources list, or None if list is not cacheable.
+
+        The ETag changes with the config timestamp and the request args.
+
+        :param datetime config_timestamp: Timestamp of last config change
+        """
+        if get_flashed_messages():
+            # do not cache pages with flash messages
+            return None
+
+        parts = [
+            self.handler().tenant,
+            str(config_timestamp),
+            request.query_string.decode('utf-8'),
+            # refresh cached CSRF tokens
+            str(flask_session.get('csrf_token')),
+            str(int(time.time() // self.INDEX_ETAG_LIFETIME))
+        ]
+        return hashlib.md5(":".join(parts).encode('utf-8')).hexdigest()
 
     def index(self):
-        """Show resources list."""
+        """Show resources list.
+
+        Uses keyset pagination, which seeks to the page following or
+        preceding the key values in the 'cursor' request arg.
+        Returns 304 Not Modified if the list is unchanged since the
+        last request.
+        """
         self.setup_models()
 
         session = self.session()
 
+        config_timestamp = self.get_config_timestamp(session)
+        etag = self.index_etag(config_timestamp)
+        if etag is not None and request.if_none_match.contains(etag):
+            # resources list not modified
+            session.close()
+            response = Response(status=304)
+            response.set_etag(etag)
+            return response
+
         # get resources filtered by resource type
         search_text = self.search_text_arg()
         active_resource_type = request.args.get('type')
@@ -119,29 +290,63 @@ class ResourcesController(Controller):
         # order by sort args
         sort, sort_asc = self.sort_args()
         sort_param = None
-        if sort is not None:
-            order_by = self.order_by_criterion(sort, sort_asc)
-            if order_by is not None:
-                if type(order_by) is tuple:
-                    # order by multiple sort columns
-                    query = query.order_by(None).order_by(*order_by)
-                else:
-                    # order by single sort column
-                    query = query.order_by(None).order_by(order_by)
-
-                sort_param = sort
-                if not sort_asc:
-                    # append sort direction suffix
-                    sort_param = "%s-" % sort
+        keys = self.sort_keys(sort, sort_asc)
+        if sort is not None and keys is not None:
+            sort_param = sort
+            if not sort_asc:
+                # append sort direction suffix
+                sort_param = "%s-" % sort
+        else:
+            # use default order
+            keys = self.sort_keys(None, True)
 
         # paginate
         page, per_page = self.pagination_args()
-        num_pages = math.ceil(query.count() / per_page)
-        resources = query.limit(per_page).offset((page - 1) * per_page).all()
+        cursor = self.decode_cursor(request.args.get('cursor'), keys)
+        backwards = cursor is not None and cursor[0] == 'prev'
+        if backwards:
+            # seek in reversed sort order for previous page
+            query_keys = [(column, not asc) for column, asc in keys]
+        else:
+            query_keys = keys
+        query = query.order_by(None).order_by(*[
+            column if asc else column.desc() for column, asc in query_keys
+        ])
+        if cursor is not None:
+            query = query.filter(self.keyset_filter(query_keys, cursor[1]))
+        else:
+            page = 1
+
+        # fetch additional row to detect any further page
+        query = query.add_columns(*[column for column, asc in keys])
+        rows = query.limit(per_page + 1).all()
+        has_more = len(rows) > per_page
+        rows = rows[:per_page]
+        if backwards:
+            rows.reverse()
+            has_prev, has_next = has_more, True
+        else:
+            has_prev, has_next = cursor is not None, has_more
+
+        resources = [row[0] for row in rows]
+
+        prev_cursor = None
+        next_cursor = None
+        if rows:
+            if has_prev:
+                prev_cursor = self.encode_cursor('prev', rows[0][1:])
+            if has_next:
+                next_cursor = self.encode_cursor('next', rows[-1][1:])
+
+        approx_count = None
+        if search_text is None and active_resource_type is None:
+            approx_count = self.approximate_count(session)
 
         pagination = {
             'page': page,
-            'num_pages': num_pages,
+            'prev_cursor': prev_cursor,
+            'next_cursor': next_cursor,
+            'approx_count': approx_count,
             'per_page': per_page,
             'per_page_options': self.PER_PAGE_OPTIONS,
             'per_page_default': self.DEFAULT_PER_PAGE,
@@ -152,23 +357,31 @@ class ResourcesController(Controller):
             }
         }
 
-        # query resource types
-        resource_types = OrderedDict()
-        query = session.query(self.ResourceType) \
-            .order_by(self.ResourceType.list_order, self.ResourceType.name)
-        for resource_type in query.all():
-            resource_types[resource_type.name] = resource_type.description
+        # get resource types
+        resource_types = OrderedDict([
+            (name, description) for name, description, list_order
+            in self.resource_types_list(
+                self.handler().tenant, config_timestamp
+            )
+        ])
 
         session.close()
 
-        return render_template(
+        response = make_response(render_template(
             '%s/index.html' % self.templates_dir, resources=resources,
             endpoint_suffix=self.endpoint_suffix, pkey=self.resource_pkey(),
             search_text=search_text, pagination=pagination,
             sort=sort, sort_asc=sort_asc,
             base_route=self.base_route, resource_types=resource_types,
             active_resource_type=active_resource_type
-        )
+        ))
+        if etag is not None:
+            # revalidate cached resources list on every request
+            response.set_etag(etag)
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+
+        return response
 
     def find_resource(self, id, session):
         """Find resource by ID.
@@ -176,7 +389,8 @@ class ResourcesController(Controller):
         :param int id: Resource ID
         :param Session session: DB session
         """
-        return session.query(self.Resource).filter_by(id=id).first()
+        # look up resource in identity map before querying DB
+        return session.query(self.Resource).get(id)
 
     def destroy_casacaded(self, id):
         """Delete existing resource and its children.
@@ -227,17 +441,30 @@ class ResourcesController(Controller):
             abort(404)
 
     def destroy_resource_cascaded(self, resource, session):
-        """Recursively delete existing resource and its children in DB.
+        """Delete existing resource and its children in DB.
 
         :param object resource: Resource object
         :param Session session: DB session
         """
-        # recursively delete child resources (depth first)
-        for child in resource.children:
-            self.destroy_resource_cascaded(child, session)
+        Resource = self.Resource
+
+        # recursively collect IDs of resource and its children
+        #   NOTE: UNION stops on any cycles in parent relations
+        subtree = session.query(Resource.id.label('id')) \
+            .filter(Resource.id == resource.id) \
+            .cte('subtree', recursive=True)
+        subtree = subtree.union(
+            session.query(Resource.id)
+            .join(subtree, Resource.parent_id == subtree.c.id)
+        )
 
-        # delete resource
-        session.delete(resource)
+        # delete resource and its children in a single statement
+        resources_table = Resource.__table__
+        session.execute(
+            resources_table.delete().where(
+                resources_table.c.id.in_(select([subtree.c.id]))
+            )
+        )
 
     def create_form(self, resource=None, edit_form=False):
         """Return form with fields loaded from DB.
@@ -249,49 +476,43 @@ class ResourcesController(Controller):
 
         session = self.session()
 
-        # query resource types
-        query = session.query(self.ResourceType) \
-            .order_by(self.ResourceType.list_order, self.ResourceType.name)
-        resource_types = query.all()
-
-        # query resources
-        query = session.query(self.Resource) \
-            .join(self.Resource.resource_types) \
-            .order_by(self.ResourceType.list_order, self.Resource.type,
-                      self.Resource.name)
-        # eager load relations
-        query = query.options(
-            joinedload(self.Resource.resource_type)
-        )
-        resources = query.all()
-
-        session.close()
-
         # set choices for type select field
         form.type.choices = [
-            (t.name, t.description) for t in resource_types
+            (name, description) for name, description, list_order
+            in self.resource_types_list(
+                self.handler().tenant, self.get_config_timestamp(session)
+            )
         ]
 
         resource_type = request.args.get('type')
         if resource_type is not None:
             form.type.data = resource_type
 
-        # set choices for parent select field
-        form.parent_id.choices = [(0, "")] + [
-            (r.id, "%s: %s" % (r.type, r.name)) for r in resources
-        ]
+        # query resources
+        query = session.query(self.Resource) \
+            .join(self.Resource.resource_types) \
+            .order_by(self.ResourceType.list_order, self.Resource.type,
+                      self.Resource.name)
+        # eager load resource types from joined table
+        query = query.options(
+            contains_eager(self.Resource.resource_types), raiseload('*')
+        )
 
-        # set choices for parent select field, grouped by resource type
+        # set choices for parent select field, and grouped by resource type,
+        # while streaming resources in batches
+        parent_id_choices = [(0, "")]
         current_type = None
         group = {}
         form.parent_choices = []
-        for r in resources:
+        for r in query.yield_per(100):
+            parent_id_choices.append((r.id, "%s: %s" % (r.type, r.name)))
+
             if r.type != current_type:
                 # add new group
                 current_type = r.type
                 group = {
                     'resource_type': r.type,
-                    'group_label': r.resource_type.description,
+                    'group_label': r.resource_types.description,
                     'options': []
                 }
 
@@ -300,6 +521,10 @@ class ResourcesController(Controller):
             # add resource to group
             group['options'].append((r.id, r.name))
 
+        form.parent_id.choices = parent_id_choices
+
+        session.close()
+
         return form
 
     def create_or_update_resources(self, resource, form, session):
@@ -340,22 +565,25 @@ class ResourcesController(Controller):
 
         if resource is not None:
             # get root resource
-            root = resource
-            parent = root.parent
-            while parent is not None:
-                root = parent
-                parent = root.parent
+            root_id = self.root_resource_id(resource, session)
 
-            # recursively collect hierarchy
+            # collect hierarchy
             items = []
-            self.collect_resources(root, 0, items, session)
-
-            # query resource types
-            resource_types = OrderedDict()
-            query = session.query(self.ResourceType) \
-                .order_by(self.ResourceType.list_order, self.ResourceType.name)
-            for resource_type in query.all():
-                resource_types[resource_type.name] = resource_type.description
+            query = self.hierarchy_query(root_id, session)
+            for item_resource, depth, has_permissions in query.all():
+                items.append({
+                    'depth': depth,
+                    'resource': item_resource,
+                    'permissions': has_permissions
+                })
+
+            # get resource types
+            resource_types = OrderedDict([
+                (name, description) for name, description, list_order
+                in self.resource_types_list(
+                    self.handler().tenant, self.get_config_timestamp(session)
+                )
+            ])
 
             session.close()
 
@@ -370,36 +598,92 @@ class ResourcesController(Controller):
             session.close()
             abort(404)
 
-    def collect_resources(self, resource, depth, items, session):
-        """Recursively collect resource hierarchy from DB.
+    def root_resource_id(self, resource, session):
+        """Return ID of topmost ancestor of a resource.
+
+        The ancestors are collected with a single recursive query.
 
         :param object resource: Resource object
-        :param int depth: Hierarchy depth
-        :param list[object] choices: List of collected resources
         :param Session session: DB session
         """
-        # query resource permissions
-        query = session.query(self.Permission) \
-            .filter(self.Permission.resource_id == resource.id)
-        has_permissions = query.count() > 0
-
-        # add resource
-        items.append({
-            'depth': depth,
-            'resource': resource,
-            'permissions': has_permissions
-        })
-
-        # get sorted children
-        query = session.query(self.Resource) \
-            .join(self.Resource.resource_types) \
-            .order_by(self.ResourceType.list_order, self.Resource.type,
-                      self.Resource.name, self.Resource.id) \
-            .filter(self.Resource.parent_id == resource.id)
+        Resource = self.Resource
+
+        # recursively collect ancestors
+        #   NOTE: UNION stops on any cycles in parent relations
+        ancestors = session.query(
+            Resource.id.label('id'), Resource.parent_id.label('parent_id')
+        ).filter(Resource.id == resource.id) \
+            .cte('ancestors', recursive=True)
+        ancestors = ancestors.union(
+            session.query(Resource.id, Resource.parent_id)
+            .join(ancestors, Resource.id == ancestors.c.parent_id)
+        )
+
+        root_id = session.query(ancestors.c.id) \
+            .filter(ancestors.c.parent_id.is_(None)) \
+            .scalar()
+        if root_id is None:
+            # cyclic parent relations
+            root_id = resource.id
+
+        return root_id
 
-        # recursively collect children
-        for child in query.all():
-            self.collect_resources(child, depth + 1, items, session)
+    def hierarchy_query(self, root_id, session):
+        """Return query for resource hierarchy as rows of
+        (resource, depth, has_permissions) in hierarchy order.
+
+        The hierarchy is collected with a single recursive query.
+
+        :param int root_id: Root resource ID
+        :param Session session: DB session
+        """
+        Resource = self.Resource
+
+        # sort key of resource, as text array with zero padded numbers
+        #   NOTE: list_order is shifted to keep sort order of negative values
+        sort_key = array([
+            func.lpad(cast(
+                cast(self.ResourceType.list_order, BigInteger) + 2**31, Text
+            ), 10, '0'),
+            cast(Resource.type, Text), cast(Resource.name, Text),
+            func.lpad(cast(Resource.id, Text), 10, '0')
+        ])
+
+        # recursively collect children with sort path and IDs of their
+        # ancestors
+        hierarchy = session.query(
+            Resource.id.label('id'), literal(0).label('depth'),
+            sort_key.label('sort_path'), array([Resource.id]).label('id_path')
+        ).join(Resource.resource_types) \
+            .filter(Resource.id == root_id) \
+            .cte('hierarchy', recursive=True)
+        hierarchy = hierarchy.union_all(
+            session.query(
+                Resource.id, hierarchy.c.depth + 1,
+                hierarchy.c.sort_path.op('||')(sort_key),
+                hierarchy.c.id_path.op('||')(array([Resource.id]))
+            ).join(Resource.resource_types)
+            .join(hierarchy, Resource.parent_id == hierarchy.c.id)
+            # stop on cyclic parent relations
+            .filter(Resource.id != all_(hierarchy.c.id_path))
+        )
+
+        # check for resource permissions
+        has_permissions = exists().where(
+            self.Permission.resource_id == Resource.id
+        )
+
+        return session.query(
+            Resource, hierarchy.c.depth, has_permissions.label('permissions')
+        ).join(hierarchy, hierarchy.c.id == Resource.id) \
+            .order_by(hierarchy.c.sort_path)
+
+    def config_generator_cache_key(self, path):
+        """Return cache key for config generator response of current tenant.
+
+        :param str path: Config generator service path (e.g. 'maps')
+        """
+        return "config_generator:%s:%s" % (self.handler().tenant, path)
 
     def import_maps(self):
         """Import map resources."""
@@ -413,46 +697,45 @@ class ResourcesController(Controller):
 
         session = None
         try:
-            # get maps for tenant from config generator service
-            url = urljoin(config_generator_service_url, 'maps')
-            tenant = self.handler().tenant
-            response = requests.get(url, params={'tenant': tenant})
-            if response.status_code != requests.codes.ok:
-                self.logger.error(
-                    "Could not get maps from %s:\n%s" %
-                    (response.url, response.content)
-                )
-                flash(
-                    'Could not import maps: Status %s' %
-                    response.status_code, 'error'
+            # get maps for tenant from cache or config generator service
+            cache_key = self.config_generator_cache_key('maps')
+            maps_from_config = cache.get(cache_key)
+            if maps_from_config is None:
+                url = urljoin(config_generator_service_url, 'maps')
+                tenant = self.handler().tenant
+                response = self.http_session.get(
+                    url, params={'tenant': tenant},
+                    timeout=self.CONFIG_GENERATOR_TIMEOUT
                 )
-                return redirect(url_for(self.base_route))
+                if response.status_code != requests.codes.ok:
+                    self.logger.error(
+                        "Could not get maps from %s:\n%s" %
+                        (response.url, response.content)
+                    )
+                    flash(
+                        'Could not import maps: Status %s' %
+                        response.status_code, 'error'
+                    )
+                    return redirect(url_for(self.base_route))
 
-            maps_from_config = response.json()
+                maps_from_config = ujson.loads(response.content)
+                cache.set(
+                    cache_key, maps_from_config,
+                    timeout=self.CONFIG_GENERATOR_CACHE_TIMEOUT
+                )
 
             self.setup_models()
             session = self.session()
 
-            # get maps from ConfigDB
-            query = session.query(self.Resource) \
-                .filter(self.Resource.type == 'map')
-            maps = [
-                resource.name for resource in query.all()
-            ]
-
             # add additional maps to ConfigDB
-            new_maps = sorted(list(set(maps_from_config) - set(maps)))
+            new_maps = self.insert_new_resources(
+                'map', maps_from_config, None, session
+            )
             if new_maps:
-                for map_name in new_maps:
-                    # create new map resource
-                    resource = self.Resource()
-                    resource.type = 'map'
-                    resource.name = map_name
-                    session.add(resource)
-
                 # commit resources
                 session.commit()
                 self.update_config_timestamp(session)
+                cache.delete(cache_key)
 
                 flash(
                     '%d new maps have been added.' %
@@ -519,50 +802,46 @@ class ResourcesController(Controller):
         :param Session session: DB session
         """
         try:
-            # get map details from config generator service
-            url = urljoin(
-                config_generator_service_url, 'maps/%s' % map_resource.name
-            )
-            tenant = self.handler().tenant
-            response = requests.get(url, params={'tenant': tenant})
-            if response.status_code != requests.codes.ok:
-                self.logger.error(
-                    "Could not get map details from %s:\n%s" %
-                    (response.url, response.content)
+            # get map details from cache or config generator service
+            path = 'maps/%s' % map_resource.name
+            cache_key = self.config_generator_cache_key(path)
+            map_details = cache.get(cache_key)
+            if map_details is None:
+                url = urljoin(config_generator_service_url, path)
+                tenant = self.handler().tenant
+                response = self.http_session.get(
+                    url, params={'tenant': tenant},
+                    timeout=self.CONFIG_GENERATOR_TIMEOUT
                 )
-                flash(
-                    'Could not import layers: Status %s' %
-                    response.status_code, 'error'
+                if response.status_code != requests.codes.ok:
+                    self.logger.error(
+                        "Could not get map details from %s:\n%s" %
+                        (response.url, response.content)
+                    )
+                    flash(
+                        'Could not import layers: Status %s' %
+                        response.status_code, 'error'
+                    )
+                    return redirect(url_for(self.base_route))
+
+                map_details = ujson.loads(response.content)
+                cache.set(
+                    cache_key, map_details,
+                    timeout=self.CONFIG_GENERATOR_CACHE_TIMEOUT
                 )
-                return redirect(url_for(self.base_route))
 
-            layers_from_config = response.json().get('layers', [])
+            layers_from_config = map_details.get('layers', [])
 
             if layers_from_config:
-                # get map layers from ConfigDB
-                query = session.query(self.Resource) \
-                    .filter(self.Resource.type == 'layer') \
-                    .filter(self.Resource.parent_id == map_resource.id)
-                layers = [
-                    resource.name for resource in query.all()
-                ]
-
-                # add additional layers to ConfigDB
-                new_layers = sorted(
-                    list(set(layers_from_config) - set(layers))
+                # add additional map layers to ConfigDB
+                new_layers = self.insert_new_resources(
+                    'layer', layers_from_config, map_resource.id, session
                 )
                 if new_layers:
-                    for layer in new_layers:
-                        # create new layer resource
-                        resource = self.Resource()
-                        resource.type = 'layer'
-                        resource.name = layer
-                        resource.parent_id = map_resource.id
-                        session.add(resource)
-
                     # commit resources
                     session.commit()
                     self.update_config_timestamp(session)
+                    cache.delete(cache_key)
 
                     flash(
                         '%d new layers have been added.' %
@@ -577,3 +856,60 @@ class ResourcesController(Controller):
             msg = "Could not import layers: %s" % e
             self.logger.error(msg)
             flash(msg, 'error')
+
+    def insert_new_resources(self, resource_type, names, parent_id, session):
+        """Add resources not yet in ConfigDB and return the names of the
+        added resources.
+
+        :param str resource_type: Resource type
+        :param list[str] names: Resource names
+        :param int parent_id: Optional parent resource ID
+                              (None for top-level resources)
+        :param Session session: DB session
+        """
+        if not names:
+            # no resources to add
+            return []
+
+        Resource = self.Resource
+
+        # unnest names array
+        new_names = select([
+            func.unnest(cast(
+                bindparam('names', sorted(set(names)), type_=ARRAY(String)),
+                ARRAY(String)
+            )).label('name')
+        ]).alias('new_names')
+
+        columns = ['type', 'name']
+        values = [literal(resource_type), new_names.c.name]
+        criterion = [
+            Resource.type == resource_type, Resource.name == new_names.c.name
+        ]
+        if parent_id is not None:
+            columns.append('parent_id')
+            values.append(literal(parent_id))
+            criterion.append(Resource.parent_id == parent_id)
+        missing = ~exists().where(and_(*criterion))
+
+        # get names without existing resource
+        query = select([new_names.c.name]).where(missing)
+        missing_names = [row.name for row in session.execute(query)]
+        if not missing_names:
+            # skip write if there are no new resources
+            return []
+
+        # add missing resources in a single statement
+        #   NOTE: resources added concurrently are skipped by the repeated
+        #         check, or by ON CONFLICT if there is a unique index
+        query = select(values).where(missing).order_by(new_names.c.name)
+        resources_table = Resource.__table__
+        stmt = insert(resources_table) \
+            .from_select(columns, query) \
+            .on_conflict_do_nothing() \
+            .returning(resources_table.c.name)
+
+        return [
+            row.name for row in
+            session.execute(stmt, {'names': sorted(missing_names)})
+        ]
@@ -20,7 +20,7 @@ from qwc_services_core.jwt import jwt_manager
 from access_control import AccessControl
 from controllers import UsersController, GroupsController, RolesController, \
     ResourcesController, PermissionsController, RegistrableGroupsController, \
-    RegistrationRequestsController
+    RegistrationRequestsController, cache
 
 
 # Flask application
@@ -40,6 +40,18 @@ Bootstrap(app)
 jwt = jwt_manager(app)
 
 
+# Setup cache
+def cache_config_from_env(app):
+    app.config['CACHE_TYPE'] = os.environ.get('CACHE_TYPE', 'simple')
+    app.config['CACHE_DEFAULT_TIMEOUT'] = int(
+        os.environ.get('CACHE_DEFAULT_TIMEOUT', 300))
+    app.config['CACHE_REDIS_URL'] = os.environ.get('CACHE_REDIS_URL')
+
+
+cache_config_from_env(app)
+cache.init_app(app)
+
+
 # Setup mailer
 def mail_config_from_env(app):
     app.config['MAIL_SERVER'] = os.environ.get('MAIL_SERVER', '127.0.0.1')